@@ -0,0 +1,41 @@
+"""Helpers shared by the scripts in this directory.
+
+The scripts import this module as a sibling, so run them as files
+(e.g. poetry run python scripts/convert_events.py), not as package modules.
+"""
+
+import json
+import os
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib codec
+    orjson = None
+
+
+def json_loads(data: bytes):
+    """Parse a JSON document, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Serialize an object to compact UTF-8 encoded JSON."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def json_dumps_line(obj) -> bytes:
+    """Serialize an object to a compact, newline-terminated JSON line."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return json_dumps(obj) + b"\n"
+
+
+def list_json_files(input_dir: Path) -> list[Path]:
+    """List the .json files directly inside input_dir, sorted by name."""
+    with os.scandir(input_dir) as entries:
+        return sorted(Path(entry.path) for entry in entries if entry.name.endswith(".json") and entry.is_file())
@@ -0,0 +1,148 @@
+# cython: language_level=3
+"""Compiled versions of the per-event conversion in convert_events.py.
+
+Optional; build in place with: cythonize -i scripts/_convert.pyx
+"""
+
+from datetime import datetime, timezone
+
+from libc.stdint cimport int64_t
+
+
+# Values that are dropped instead of copied to the upload event
+cdef tuple _EMPTY_VALUES = (None, "", {})
+
+# Export fields copied to upload events, set by convert_events.py from FIELD_MAPPING
+cdef frozenset _allowed_fields = frozenset()
+
+
+def set_allowed_fields(allowed_fields):
+    """Set the export fields that convert_event copies to upload events."""
+    global _allowed_fields
+    _allowed_fields = frozenset(allowed_fields)
+
+
+cdef inline int _digits(str s, Py_ssize_t start, Py_ssize_t end):
+    """Return the integer value of s[start:end], or -1 if it is not all ASCII digits."""
+    cdef int value = 0
+    cdef Py_ssize_t i
+    cdef Py_UCS4 c
+    for i in range(start, end):
+        c = s[i]
+        if c < u'0' or c > u'9':
+            return -1
+        value = value * 10 + (<int>c - 48)
+    return value
+
+
+cdef inline int _days_in_month(int year, int month):
+    if month == 2:
+        return 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28
+    if month == 4 or month == 6 or month == 9 or month == 11:
+        return 30
+    return 31
+
+
+cdef inline int64_t _days_from_civil(int64_t year, int month, int day):
+    """Days since 1970-01-01 for a proleptic Gregorian date (year >= 1)."""
+    if month <= 2:
+        year -= 1
+    cdef int64_t era = year // 400
+    cdef int64_t year_of_era = year - era * 400
+    cdef int64_t day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    cdef int64_t day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+cdef bint _parse_time_string(str ts_str, int64_t *millis):
+    """Parse a UTC "YYYY-MM-DD HH:MM:SS[.ffffff]" string into milliseconds since epoch.
+
+    Returns False, leaving millis untouched, if the string does not have exactly that shape.
+    """
+    cdef Py_ssize_t length = len(ts_str)
+    if (length < 19 or ts_str[4] != u'-' or ts_str[7] != u'-' or ts_str[10] != u' '
+            or ts_str[13] != u':' or ts_str[16] != u':'):
+        return False
+
+    cdef int year = _digits(ts_str, 0, 4)
+    cdef int month = _digits(ts_str, 5, 7)
+    cdef int day = _digits(ts_str, 8, 10)
+    cdef int hour = _digits(ts_str, 11, 13)
+    cdef int minute = _digits(ts_str, 14, 16)
+    cdef int second = _digits(ts_str, 17, 19)
+    if (year < 1 or month < 1 or month > 12 or day < 1 or day > _days_in_month(year, month)
+            or hour < 0 or hour > 23 or minute < 0 or minute > 59 or second < 0 or second > 59):
+        return False
+
+    cdef int64_t result = (_days_from_civil(year, month, day) * 86400 + hour * 3600 + minute * 60 + second) * 1000
+
+    cdef int fraction
+    cdef Py_ssize_t fraction_digits
+    if length > 19:
+        fraction_digits = length - 20
+        if ts_str[19] != u'.' or fraction_digits < 1 or fraction_digits > 6:
+            return False
+        fraction = _digits(ts_str, 20, length)
+        if fraction < 0:
+            return False
+        # Scale the fraction to milliseconds, truncating sub-millisecond digits
+        while fraction_digits > 3:
+            fraction //= 10
+            fraction_digits -= 1
+        while fraction_digits < 3:
+            fraction *= 10
+            fraction_digits += 1
+        result += fraction
+
+    millis[0] = result
+    return True
+
+
+cpdef object parse_timestamp(dict event):
+    """Parse event timestamp and convert to milliseconds; see convert_events.parse_timestamp."""
+    cdef int64_t millis
+    for field in ("event_time", "client_event_time", "server_received_time"):
+        ts_str = event.get(field)
+        if ts_str:
+            if type(ts_str) is str and _parse_time_string(<str>ts_str, &millis):
+                return millis
+            try:
+                # Fall back to strptime for anything less regular
+                if "." in ts_str:
+                    dt = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S.%f")
+                else:
+                    dt = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
+                return int(dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
+            except (ValueError, TypeError):
+                continue
+
+    # If we have a numeric timestamp already
+    time = event.get("time")
+    if time:
+        return int(time)
+
+    return None
+
+
+cpdef dict convert_event(dict export_event):
+    """Convert a single event from export format to upload format; see convert_events.convert_event."""
+    cdef dict upload_event = {}
+
+    # Copy standard fields, skipping missing values, empty strings and empty dicts
+    for field, value in export_event.items():
+        if field in _allowed_fields and value not in _EMPTY_VALUES:
+            upload_event[field] = value
+
+    # Handle timestamp conversion
+    timestamp = parse_timestamp(export_event)
+    if timestamp:
+        upload_event["time"] = timestamp
+
+    # Validate required fields
+    if not (upload_event.get("user_id") or upload_event.get("device_id")):
+        return None  # Skip events without user identification
+
+    if not upload_event.get("event_type"):
+        return None  # Skip events without event type
+
+    return upload_event
@@ -5,10 +5,15 @@ Run with: poetry run python scripts/bundle_requests.py --input ./converted --out
 """
 
 import argparse
-import json
+import gzip
 import os
+import re
+from collections.abc import Iterable, Iterator
+from contextlib import nullcontext
 from pathlib import Path
 
+from _common import json_dumps, list_json_files
+
 
 # API limits
 MAX_EVENTS_PER_BATCH = 2000
@@ -16,105 +21,135 @@ MAX_PAYLOAD_BYTES = 20 * 1024 * 1024  # 20MB
 # Leave some headroom for the JSON wrapper and API key
 SAFE_PAYLOAD_BYTES = 19 * 1024 * 1024  # 19MB to be safe
 
+# Compression level for gzipped payloads; favours speed over the last few percent of size
+GZIP_COMPRESS_LEVEL = 6
+
+# Names of the per-batch files this script writes
+BATCH_FILE_PATTERN = re.compile(r"batch_\d{4,}\.(sh|json|json\.gz)")
+
+# Write buffer for payload files
+PAYLOAD_WRITE_BUFFER_SIZE = 1024 * 1024  # 1MB
+
+
+def iter_event_blobs(input_dir: Path) -> Iterator[bytes]:
+    """Yield the serialized events from converted JSON files one at a time.
 
-def read_all_events(input_dir: Path) -> list[dict]:
-    """Read all events from converted JSON files."""
-    all_events = []
+    convert_events.py writes one compact JSON object per line, so each line is
+    passed through as-is instead of being parsed and serialized again.
+    """
+    for json_file in list_json_files(input_dir):
+        # Read each file in one go and split it in memory rather than line by line
+        for line in json_file.read_bytes().splitlines():
+            line = line.strip()
+            if line:
+                yield line
 
-    json_files = list(input_dir.glob("*.json"))
-    if not json_files:
-        return all_events
 
-    for json_file in sorted(json_files):
-        with open(json_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    event = json.loads(line)
-                    all_events.append(event)
-                except json.JSONDecodeError:
-                    continue
+def payload_wrapper(api_key: str) -> tuple[bytes, bytes]:
+    """Return the bytes that go before and after the comma-separated events in a payload."""
+    return b'{"api_key":' + json_dumps(api_key) + b',"events":[', b']}'
 
-    return all_events
 
+def write_payload(payload_path: Path, api_key: str, event_blobs: list[bytes], compress: bool = False) -> int:
+    """Write the API payload for a batch of serialized events to payload_path.
 
-def create_payload(api_key: str, events: list[dict]) -> dict:
-    """Create the full API payload."""
-    return {
-        "api_key": api_key,
-        "events": events
-    }
+    The payload is streamed piece by piece through a large write buffer (and gzip
+    when compress is set) rather than assembled in memory first.
+    Returns the uncompressed payload size in bytes.
+    """
+    prefix, suffix = payload_wrapper(api_key)
 
+    with open(payload_path, 'wb', buffering=PAYLOAD_WRITE_BUFFER_SIZE) as raw, (
+        gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=GZIP_COMPRESS_LEVEL) if compress else nullcontext(raw)
+    ) as f:
+        f.write(prefix)
+        for i, event_blob in enumerate(event_blobs):
+            if i:
+                f.write(b',')
+            f.write(event_blob)
+        f.write(suffix)
 
-def estimate_payload_size(api_key: str, events: list[dict]) -> int:
-    """Estimate the JSON payload size in bytes."""
-    payload = create_payload(api_key, events)
-    return len(json.dumps(payload).encode('utf-8'))
+    return len(prefix) + sum(map(len, event_blobs)) + max(len(event_blobs) - 1, 0) + len(suffix)
 
 
-def batch_events(events: list[dict], api_key: str) -> list[list[dict]]:
-    """Split events into batches respecting size and count limits."""
-    batches = []
+def batch_events(event_blobs: Iterable[bytes], api_key: str) -> Iterator[list[bytes]]:
+    """Split serialized events into batches respecting size and count limits.
+
+    The payload size is tracked as a running total of the event sizes.
+    Batches are ready for write_payload and are yielded as soon as
+    they are full so only one is held at a time.
+    """
     current_batch = []
 
-    for event in events:
-        # Try adding to current batch
-        test_batch = current_batch + [event]
+    # Size of the payload wrapper with an empty events list
+    prefix, suffix = payload_wrapper(api_key)
+    wrapper_size = len(prefix) + len(suffix)
+    current_size = wrapper_size
 
-        # Check count limit
-        if len(test_batch) > MAX_EVENTS_PER_BATCH:
-            # Current batch is full, start new one
-            if current_batch:
-                batches.append(current_batch)
-            current_batch = [event]
-            continue
+    for event_blob in event_blobs:
+        event_size = len(event_blob)
+        # Every event after the first needs a separating comma
+        added_size = event_size + 1 if current_batch else event_size
 
-        # Check size limit
-        if estimate_payload_size(api_key, test_batch) > SAFE_PAYLOAD_BYTES:
-            # Would exceed size limit, start new batch
+        # Check count and size limits
+        if len(current_batch) >= MAX_EVENTS_PER_BATCH or current_size + added_size > SAFE_PAYLOAD_BYTES:
+            # Current batch is full, start new one
             if current_batch:
-                batches.append(current_batch)
-            current_batch = [event]
+                yield current_batch
+            current_batch = [event_blob]
+            current_size = wrapper_size + event_size
             continue
 
         # Event fits in current batch
-        current_batch = test_batch
+        current_batch.append(event_blob)
+        current_size += added_size
 
     # Don't forget the last batch
     if current_batch:
-        batches.append(current_batch)
-
-    return batches
+        yield current_batch
 
 
 def generate_curl_script(
     batch_num: int,
     api_key: str,
-    events: list[dict],
+    event_blobs: list[bytes],
     output_dir: Path,
-    eu: bool = False
-) -> Path:
-    """Generate a shell script with curl command for a batch."""
+    eu: bool = False,
+    compress: bool = False
+) -> tuple[Path, int]:
+    """Generate a shell script with curl command for a batch.
+
+    The payload is written to a sibling JSON file that curl sends with --data-binary,
+    so the script itself stays small and needs no shell quoting of the events.
+    With compress, the file is gzipped and sent with Content-Encoding: gzip.
+    Returns the script path and the uncompressed payload size in bytes.
+    """
     endpoint = "https://api.eu.amplitude.com/batch" if eu else "https://api2.amplitude.com/batch"
 
-    payload = create_payload(api_key, events)
-    payload_json = json.dumps(payload, separators=(',', ':'))  # Compact JSON
+    # Write the payload next to the script
+    if compress:
+        payload_path = output_dir / f"batch_{batch_num:04d}.json.gz"
+        payload_size = write_payload(payload_path, api_key, event_blobs, compress=True)
+        size_note = f"{payload_size} bytes ({payload_path.stat().st_size} bytes gzipped)"
+        encoding_header = "\n  -H 'Content-Encoding: gzip' \\"
+    else:
+        payload_path = output_dir / f"batch_{batch_num:04d}.json"
+        payload_size = write_payload(payload_path, api_key, event_blobs)
+        size_note = f"{payload_size} bytes"
+        encoding_header = ""
 
     # Create the shell script
     script_path = output_dir / f"batch_{batch_num:04d}.sh"
 
-    # Escape single quotes in the JSON for shell
-    escaped_json = payload_json.replace("'", "'\\''")
-
     script_content = f"""#!/bin/bash
-# Batch {batch_num}: {len(events)} events
-# Payload size: {len(payload_json)} bytes
+# Batch {batch_num}: {len(event_blobs)} events
+# Payload size: {size_note}
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 
 curl -X POST '{endpoint}' \\
-  -H 'Content-Type: application/json' \\
-  -d '{escaped_json}'
+  -H 'Content-Type: application/json' \\{encoding_header}
+  --data-binary @"$SCRIPT_DIR/{payload_path.name}"
 
 echo ""
 echo "Batch {batch_num} complete"
@@ -126,38 +161,37 @@ echo "Batch {batch_num} complete"
     # Make executable
     os.chmod(script_path, 0o755)
 
-    return script_path
+    return script_path, payload_size
 
 
-def generate_run_all_script(output_dir: Path, num_batches: int, delay_seconds: int = 1):
-    """Generate a master script that runs all batches with delays."""
+def generate_run_all_script(output_dir: Path, num_batches: int, delay_seconds: int = 1, parallel: int = 1):
+    """Generate a master script that runs all batches, a few at a time, with delays."""
     script_path = output_dir / "run_all.sh"
 
     script_content = f"""#!/bin/bash
-# Run all {num_batches} batch scripts with {delay_seconds} second delay between each
+# Run all {num_batches} batch scripts, {parallel} at a time, with {delay_seconds} second delay after each
 # This helps respect rate limits
 
 set -e
 
-SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+export SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 
-echo "Starting upload of {num_batches} batches..."
+echo "Starting upload of {num_batches} batches ({parallel} in parallel)..."
 echo ""
 
-for i in $(seq -f "%04g" 1 {num_batches}); do
-    script="$SCRIPT_DIR/batch_$i.sh"
+seq -f "%04g" 1 {num_batches} | xargs -P {parallel} -I {{}} bash -c '
+    script="$SCRIPT_DIR/batch_$1.sh"
     if [ -f "$script" ]; then
-        echo "Running batch $i of {num_batches}..."
+        echo "Running batch $1 of {num_batches}..."
         bash "$script"
         echo ""
 
-        # Delay between batches (except after the last one)
-        if [ "$i" -lt "{num_batches:04d}" ]; then
-            echo "Waiting {delay_seconds} second(s) before next batch..."
+        # Delay before this worker picks up its next batch (except after the last one)
+        if [ "$1" != "{num_batches:04d}" ]; then
             sleep {delay_seconds}
         fi
     fi
-done
+' _ {{}}
 
 echo ""
 echo "All batches complete!"
@@ -170,6 +204,14 @@ echo "All batches complete!"
     return script_path
 
 
+def remove_previous_output(output_dir: Path):
+    """Remove the batch files and run_all.sh written by a previous run so they are not uploaded again."""
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            if (BATCH_FILE_PATTERN.fullmatch(entry.name) or entry.name == "run_all.sh") and entry.is_file():
+                os.remove(entry.path)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Bundle converted events into curl request shell scripts"
@@ -194,11 +236,22 @@ def main():
         action="store_true",
         help="Use EU data residency endpoint"
     )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Gzip batch payloads and send them with Content-Encoding: gzip"
+    )
     parser.add_argument(
         "--delay",
         type=int,
         default=1,
-        help="Seconds to delay between batches in run_all.sh (default: 1)"
+        help="Seconds each run_all.sh worker waits after a batch before starting the next (default: 1)"
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of batches run_all.sh uploads concurrently; each adds to the request rate (default: 1)"
     )
 
     args = parser.parse_args()
@@ -210,43 +263,46 @@ def main():
         print(f"Error: Input directory does not exist: {input_dir}")
         return
 
-    # Read all events
-    print(f"Reading events from {input_dir}...")
-    all_events = read_all_events(input_dir)
-    print(f"Found {len(all_events)} total events")
-
-    if not all_events:
-        print("No events to process")
+    if args.parallel < 1:
+        print(f"Error: --parallel must be at least 1, got {args.parallel}")
         return
 
-    # Batch events
-    print(f"\nBatching events (max {MAX_EVENTS_PER_BATCH} events, max ~{SAFE_PAYLOAD_BYTES // (1024*1024)}MB per batch)...")
-    batches = batch_events(all_events, args.api_key)
-    print(f"Created {len(batches)} batch(es)")
-
-    # Create output directory
-    output_dir.mkdir(parents=True, exist_ok=True)
-
-    # Generate shell scripts
+    # Read, batch and write events as a stream so only one batch is in memory at a time
+    print(f"Reading events from {input_dir}...")
+    print(f"Batching events (max {MAX_EVENTS_PER_BATCH} events, max ~{SAFE_PAYLOAD_BYTES // (1024*1024)}MB per batch)...")
     print(f"\nGenerating shell scripts in {output_dir}...")
-    for i, batch in enumerate(batches, 1):
-        script_path = generate_curl_script(i, args.api_key, batch, output_dir, args.eu)
-        payload_size = estimate_payload_size(args.api_key, batch)
+    total_events = 0
+    num_batches = 0
+    for i, batch in enumerate(batch_events(iter_event_blobs(input_dir), args.api_key), 1):
+        if i == 1:
+            # Only touch the output directory once there is something to write
+            output_dir.mkdir(parents=True, exist_ok=True)
+            remove_previous_output(output_dir)
+
+        script_path, payload_size = generate_curl_script(i, args.api_key, batch, output_dir, args.eu, args.gzip)
         print(f"  {script_path.name}: {len(batch)} events, {payload_size:,} bytes")
+        total_events += len(batch)
+        num_batches = i
+
+    if not num_batches:
+        print("No events to process")
+        return
 
     # Generate run_all.sh
-    run_all_path = generate_run_all_script(output_dir, len(batches), args.delay)
+    run_all_path = generate_run_all_script(output_dir, num_batches, args.delay, args.parallel)
     print(f"\nGenerated master script: {run_all_path}")
 
     print(f"\n{'='*60}")
     print(f"Bundle complete!")
-    print(f"  Total events: {len(all_events)}")
-    print(f"  Total batches: {len(batches)}")
+    print(f"  Total events: {total_events}")
+    print(f"  Total batches: {num_batches}")
     print(f"  Output directory: {output_dir}")
     print(f"\nTo upload all events, run:")
     print(f"  bash {output_dir}/run_all.sh")
     print(f"\nOr run individual batches:")
     print(f"  bash {output_dir}/batch_0001.sh")
+    print("\nOr upload over persistent connections without curl:")
+    print(f"  poetry run python scripts/upload_batches.py --input {output_dir}{' --eu' if args.eu else ''}")
 
 
 if __name__ == "__main__":
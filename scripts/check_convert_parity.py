@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Check that the compiled _convert module matches the pure Python conversion in convert_events.py.
+
+Build the extension first, then run: poetry run python scripts/check_convert_parity.py
+"""
+
+import argparse
+import io
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import convert_events
+from _common import json_dumps_line
+
+
+# Timestamp strings that exercise the fast path, the strptime fallback and rejection
+EDGE_CASE_TIMESTAMPS = [
+    "2024-01-15 10:30:45",
+    "2024-01-15 10:30:45.1",
+    "2024-01-15 10:30:45.123",
+    "2024-01-15 10:30:45.123456",
+    "2024-01-15 10:30:45.1234567",
+    "2024-01-15 10:30:45.",
+    "2024-01-15 10:30:45,123",
+    "2024-02-29 00:00:00",
+    "2023-02-29 00:00:00",
+    "1900-02-29 00:00:00",
+    "2000-02-29 00:00:00",
+    "2024-04-31 12:00:00",
+    "2024-13-01 12:00:00",
+    "2024-00-10 12:00:00",
+    "2024-01-00 12:00:00",
+    "2024-01-15 24:00:00",
+    "2024-01-15 23:60:00",
+    "2024-01-15 23:59:60",
+    "0001-01-01 00:00:00",
+    "0000-01-01 00:00:00",
+    "9999-12-31 23:59:59.999999",
+    "1969-12-31 23:59:59.5",
+    "2024-1-15 10:30:45",
+    "2024-01-15 1:30:45",
+    "2024-01-15T10:30:45",
+    " 024-01-15 10:30:45",
+    "+024-01-15 10:30:45",
+    "2024-01-15 10:30:45 ",
+    "２０２４-01-15 10:30:45",
+    "2024-01-15 10:30:４５",
+    "2024-01-15 10:30:45.１２３",
+    "٢٠٢٤-01-15 10:30:45",
+    "2024-01-15",
+    "garbage",
+    "",
+]
+
+# Timestamp values of other JSON types
+NON_STRING_TIMESTAMPS = [None, 0, 1, 1700000000000, 1.5, True, False, [], {}, ["2024-01-15 10:30:45"]]
+
+# Events that exercise field copying, the fallback order of timestamp fields and validation
+EDGE_CASE_EVENTS = [
+    {},
+    {"event_type": "click"},
+    {"user_id": "u1"},
+    {"user_id": "u1", "event_type": "click"},
+    {"device_id": "d1", "event_type": "click", "event_time": "2024-01-15 10:30:45.123"},
+    {"user_id": "", "device_id": None, "event_type": "click"},
+    {"user_id": "u1", "event_type": ""},
+    {"user_id": 0, "event_type": "click"},
+    {"user_id": "u1", "event_type": "click", "event_properties": {}, "user_properties": {"a": 1}},
+    {"user_id": "u1", "event_type": "click", "unknown_field": "x", "$insert_id": "y"},
+    {"user_id": "u1", "event_type": "click", "time": 1700000000000},
+    {"user_id": "u1", "event_type": "click", "time": "1700000000000"},
+    {"user_id": "u1", "event_type": "click", "time": 1.9},
+    {"user_id": "u1", "event_type": "click", "time": "abc"},
+    {"user_id": "u1", "event_type": "click", "event_time": "bad", "time": 5},
+    {"user_id": "u1", "event_type": "click", "event_time": "bad",
+     "client_event_time": "2024-01-15 10:30:45", "server_received_time": "2024-01-16 10:30:45"},
+    {"user_id": "u1", "event_type": "click", "event_time": "", "server_received_time": "2024-01-16 10:30:45"},
+    {"user_id": "u1", "event_type": "click", "event_time": "1970-01-01 00:00:00"},
+]
+
+# Lines that are valid JSON but not event objects, which process_json_file must skip
+NON_OBJECT_LINES = [b"[]", b'"x"', b"3", b"null", b"true", b'[{"user_id": "u1", "event_type": "click"}]']
+
+
+def outcome(function, *args):
+    """Return the result of calling function, or the exception type it raised."""
+    try:
+        return function(*args)
+    except Exception as e:
+        return type(e)
+
+
+def random_timestamp(rng: random.Random) -> str:
+    """Return a random timestamp string, occasionally with an out-of-range field."""
+    ts_str = (f"{rng.randint(1, 9999):04d}-{rng.randint(0, 13):02d}-{rng.randint(0, 32):02d} "
+              f"{rng.randint(0, 24):02d}:{rng.randint(0, 60):02d}:{rng.randint(0, 60):02d}")
+    fraction_digits = rng.randint(0, 7)
+    if fraction_digits:
+        ts_str += "." + "".join(rng.choice("0123456789") for _ in range(fraction_digits))
+    return ts_str
+
+
+def check_events(compiled, events) -> int:
+    """Compare parse_timestamp and convert_event on each event, returning the number of mismatches."""
+    mismatches = 0
+    for event in events:
+        for name in ("parse_timestamp", "convert_event"):
+            expected = outcome(getattr(convert_events, name), event)
+            actual = outcome(getattr(compiled, name), event)
+            if expected != actual:
+                mismatches += 1
+                print(f"  Mismatch in {name}({event!r}): Python {expected!r}, compiled {actual!r}")
+    return mismatches
+
+
+def check_file(compiled, events) -> int:
+    """Compare process_json_file output for a file of events and non-object lines."""
+    # Events that make convert_event raise would abort the whole file, so leave them to check_events
+    events = [event for event in events if not isinstance(outcome(convert_events.convert_event, event), type)]
+    lines = [*(json_dumps_line(event) for event in events), *(line + b"\n" for line in NON_OBJECT_LINES)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        input_path = Path(temp_dir) / "events.json"
+        input_path.write_bytes(b"".join(lines))
+
+        outputs = []
+        for module in (None, compiled):
+            convert_events._convert = module
+            output_fp = io.BytesIO()
+            count = convert_events.process_json_file(input_path, output_fp)
+            outputs.append((count, output_fp.getvalue()))
+
+    if outputs[0] != outputs[1]:
+        print("  Mismatch in process_json_file output")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the compiled _convert module against the pure Python conversion"
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=200000,
+        help="Number of random timestamps to compare (default: 200000)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Random seed (default: 0)"
+    )
+
+    args = parser.parse_args()
+
+    compiled = convert_events._convert
+    if compiled is None:
+        print("Error: compiled _convert module is not available; build it with: cythonize -i scripts/_convert.pyx")
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    timestamps = EDGE_CASE_TIMESTAMPS + NON_STRING_TIMESTAMPS + [random_timestamp(rng) for _ in range(args.samples)]
+    timestamp_events = [{"user_id": "u1", "event_type": "click", "event_time": ts} for ts in timestamps]
+
+    print(f"Comparing {len(EDGE_CASE_EVENTS)} edge case events and {len(timestamps)} timestamps...")
+    mismatches = check_events(compiled, EDGE_CASE_EVENTS + timestamp_events)
+    mismatches += check_file(compiled, EDGE_CASE_EVENTS + timestamp_events)
+
+    if mismatches:
+        print(f"\nFound {mismatches} mismatch(es)")
+        sys.exit(1)
+    print("\nNo mismatches")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,31 @@ Run with: poetry run python scripts/convert_events.py --input ./exports --output
 import argparse
 import json
 import os
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timezone
 from pathlib import Path
+from typing import BinaryIO
 
+from _common import json_dumps_line, json_loads, list_json_files
+
+try:
+    # Compiled convert_event/parse_timestamp, built with: cythonize -i scripts/_convert.pyx
+    # It duplicates the Python versions below: change both together and run
+    # scripts/check_convert_parity.py against a fresh build
+    import _convert
+except ImportError:  # the extension is optional, fall back to the Python versions below
+    _convert = None
+else:
+    # A build older than its sources may not match the Python code below, so ignore it until rebuilt
+    _sources = (__file__, os.path.join(os.path.dirname(__file__), "_convert.pyx"))
+    if os.path.getmtime(_convert.__file__) < max(map(os.path.getmtime, _sources)):
+        print("Warning: compiled _convert module is older than its sources and is ignored; "
+              "rebuild with: cythonize -i scripts/_convert.pyx")
+        _convert = None
+
+
+# Write buffer for converted output files
+OUTPUT_BUFFER_SIZE = 1024 * 1024  # 1MB
 
 # Mapping from Export API field names to Upload API field names
 # Some fields have different names between export and upload
@@ -68,24 +90,72 @@ FIELD_MAPPING = {
     "android_id": "android_id",
 }
 
+# Every mapping above is identity, so conversion just keeps the allowed fields
+_ALLOWED_FIELDS = frozenset(FIELD_MAPPING)
+if _convert is not None:
+    _convert.set_allowed_fields(_ALLOWED_FIELDS)
+
+# Values that are dropped instead of copied to the upload event
+_EMPTY_VALUES = (None, "", {})
+
+
+# Ordinal of the Unix epoch, used to turn calendar dates into day offsets
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _parse_time_string(ts_str: str) -> int:
+    """Convert a UTC "YYYY-MM-DD HH:MM:SS[.ffffff]" string to milliseconds since epoch.
+
+    Raises ValueError if the string does not have exactly that shape.
+    """
+    if (len(ts_str) < 19 or ts_str[4] != '-' or ts_str[7] != '-' or ts_str[10] != ' '
+            or ts_str[13] != ':' or ts_str[16] != ':'):
+        raise ValueError(f"Unexpected timestamp format: {ts_str!r}")
+
+    digits = ts_str[0:4] + ts_str[5:7] + ts_str[8:10] + ts_str[11:13] + ts_str[14:16] + ts_str[17:19]
+    if not (digits.isascii() and digits.isdigit()):
+        raise ValueError(f"Unexpected timestamp format: {ts_str!r}")
+
+    days = date(int(ts_str[0:4]), int(ts_str[5:7]), int(ts_str[8:10])).toordinal() - _EPOCH_ORDINAL
+    hour = int(ts_str[11:13])
+    minute = int(ts_str[14:16])
+    second = int(ts_str[17:19])
+    if not (hour < 24 and minute < 60 and second < 60):
+        raise ValueError(f"Time out of range: {ts_str!r}")
+
+    millis = (days * 86400 + hour * 3600 + minute * 60 + second) * 1000
+
+    if len(ts_str) > 19:
+        fraction = ts_str[20:]
+        if ts_str[19] != '.' or not (fraction.isascii() and fraction.isdigit()) or len(fraction) > 6:
+            raise ValueError(f"Unexpected timestamp format: {ts_str!r}")
+        millis += int(fraction[:3].ljust(3, '0'))
+
+    return millis
+
 
 def parse_timestamp(event: dict) -> int | None:
     """Parse event timestamp and convert to milliseconds.
 
-    Export API provides event_time as a string like "2024-01-15 10:30:45.123456"
+    Export API provides event_time as a UTC string like "2024-01-15 10:30:45.123456"
     Upload API expects time in milliseconds since epoch.
     """
     # Try different timestamp fields in order of preference
     for field in ["event_time", "client_event_time", "server_received_time"]:
         if field in event and event[field]:
+            ts_str = event[field]
+            try:
+                # Fast path for the usual format: "2024-01-15 10:30:45.123456"
+                return _parse_time_string(ts_str)
+            except (ValueError, TypeError):
+                pass
             try:
-                # Handle format: "2024-01-15 10:30:45.123456"
-                ts_str = event[field]
+                # Fall back to strptime for anything less regular
                 if "." in ts_str:
                     dt = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S.%f")
                 else:
                     dt = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
-                return int(dt.timestamp() * 1000)
+                return int(dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
             except (ValueError, TypeError):
                 continue
 
@@ -98,16 +168,11 @@ def parse_timestamp(event: dict) -> int | None:
 
 def convert_event(export_event: dict) -> dict | None:
     """Convert a single event from export format to upload format."""
-    upload_event = {}
-
-    # Map standard fields
-    for export_field, upload_field in FIELD_MAPPING.items():
-        if export_field in export_event and export_event[export_field] is not None:
-            value = export_event[export_field]
-            # Skip empty strings and empty dicts
-            if value == "" or value == {}:
-                continue
-            upload_event[upload_field] = value
+    # Copy standard fields, skipping missing values, empty strings and empty dicts
+    upload_event = {
+        field: value for field, value in export_event.items()
+        if field in _ALLOWED_FIELDS and value not in _EMPTY_VALUES
+    }
 
     # Handle timestamp conversion
     timestamp = parse_timestamp(export_event)
@@ -128,36 +193,65 @@ def convert_event(export_event: dict) -> dict | None:
     return upload_event
 
 
-def process_json_file(input_path: Path) -> list[dict]:
-    """Process a single JSON file (one event per line) and return converted events."""
-    converted = []
+def _stdlib_dumps_line(obj) -> bytes:
+    """Serialize an object to a JSON line with the stdlib codec, which escapes lone surrogates."""
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8') + b"\n"
+
+
+def process_json_file(input_path: Path, output_fp: BinaryIO) -> int:
+    """Process a single JSON file (one event per line), writing converted events to output_fp.
+
+    Returns the number of converted events.
+    """
+    converted = 0
     skipped = 0
+    convert = _convert.convert_event if _convert is not None else convert_event
 
-    with open(input_path, 'r', encoding='utf-8') as f:
+    with open(input_path, 'rb') as f:
         for line_num, line in enumerate(f, 1):
             line = line.strip()
             if not line:
                 continue
 
+            dumps_line = json_dumps_line
             try:
-                export_event = json.loads(line)
-                upload_event = convert_event(export_event)
-
-                if upload_event:
-                    converted.append(upload_event)
-                else:
+                export_event = json_loads(line)
+            except json.JSONDecodeError as e:
+                # orjson rejects lone surrogates (e.g. "\ud83d") that the stdlib codec accepts
+                try:
+                    export_event = json.loads(line)
+                except ValueError:
+                    print(f"  Warning: Invalid JSON in {input_path.name} at line {line_num}: {e}")
                     skipped += 1
+                    continue
+                dumps_line = _stdlib_dumps_line
 
-            except json.JSONDecodeError as e:
-                print(f"  Warning: Invalid JSON at line {line_num}: {e}")
+            if not isinstance(export_event, dict):
+                skipped += 1  # Valid JSON, but not an event object
+                continue
+
+            upload_event = convert(export_event)
+
+            if upload_event:
+                output_fp.write(dumps_line(upload_event))
+                converted += 1
+            else:
                 skipped += 1
 
     if skipped > 0:
-        print(f"  Skipped {skipped} invalid/incomplete events")
+        print(f"  Skipped {skipped} invalid/incomplete events in {input_path.name}")
 
     return converted
 
 
+def _convert_one(input_path: Path, output_dir: Path) -> tuple[Path, int]:
+    """Convert one export file into output_dir, returning the output path and event count."""
+    output_file = output_dir / f"converted_{input_path.name}"
+    with open(output_file, 'wb', buffering=OUTPUT_BUFFER_SIZE) as f:
+        converted_count = process_json_file(input_path, f)
+    return output_file, converted_count
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Convert exported Amplitude events to Upload API format"
@@ -186,7 +280,7 @@ def main():
     output_dir.mkdir(parents=True, exist_ok=True)
 
     # Find all JSON files in input directory
-    json_files = list(input_dir.glob("*.json"))
+    json_files = list_json_files(input_dir)
     if not json_files:
         print(f"No JSON files found in {input_dir}")
         return
@@ -195,19 +289,18 @@ def main():
 
     total_events = 0
 
-    for json_file in sorted(json_files):
-        print(f"Processing: {json_file.name}")
-
-        converted_events = process_json_file(json_file)
-        total_events += len(converted_events)
-
-        # Write converted events to output file (one event per line for consistency)
-        output_file = output_dir / f"converted_{json_file.name}"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            for event in converted_events:
-                f.write(json.dumps(event) + "\n")
-
-        print(f"  -> Converted {len(converted_events)} events to {output_file}")
+    # Files are independent, so convert them in parallel across CPU cores
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = {
+            executor.submit(_convert_one, json_file, output_dir): json_file
+            for json_file in json_files
+        }
+        for future in as_completed(futures):
+            output_file, converted_count = future.result()
+            total_events += converted_count
+
+            print(f"Processed: {futures[future].name}")
+            print(f"  -> Converted {converted_count} events to {output_file}")
 
     print(f"\nConversion complete! Total events converted: {total_events}")
     print(f"Output directory: {output_dir}")
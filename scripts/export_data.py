@@ -7,15 +7,21 @@ Run with: poetry run python scripts/export_data.py --api-key KEY --secret-key SE
 import argparse
 import base64
 import gzip
-import io
+import os
 import shutil
 import sys
+import tempfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from urllib.request import Request, urlopen
 from urllib.error import HTTPError
 
 
+# Chunk size used when streaming the download and extracted files
+COPY_BUFFER_SIZE = 1024 * 1024  # 1MB
+
+
 def get_auth_header(api_key: str, secret_key: str) -> str:
     """Generate Basic Auth header from API key and secret."""
     credentials = f"{api_key}:{secret_key}"
@@ -23,22 +29,37 @@ def get_auth_header(api_key: str, secret_key: str) -> str:
     return f"Basic {encoded}"
 
 
-def export_data(api_key: str, secret_key: str, start: str, end: str, eu: bool = False) -> bytes:
-    """Call the Amplitude Export API and return the response data."""
+def export_data(
+    api_key: str,
+    secret_key: str,
+    start: str,
+    end: str,
+    eu: bool = False,
+    download_dir: Path | None = None
+) -> Path:
+    """Call the Amplitude Export API and stream the response to a temporary zip file.
+
+    The file is created in download_dir (the system temp dir if None).
+    Returns the path of the downloaded file; the caller is responsible for removing it.
+    """
     base_url = "https://analytics.eu.amplitude.com" if eu else "https://amplitude.com"
     url = f"{base_url}/api/2/export?start={start}&end={end}"
 
     request = Request(url)
     request.add_header("Authorization", get_auth_header(api_key, secret_key))
 
-    print(f"Auth header: {get_auth_header(api_key, secret_key)}")
     print(f"Exporting data from {start} to {end}...")
     print(f"URL: {url}")
 
+    fd, zip_path = tempfile.mkstemp(suffix=".zip", dir=download_dir)
     try:
-        with urlopen(request) as response:
-            return response.read()
-    except HTTPError as e:
+        with os.fdopen(fd, 'wb') as f, urlopen(request) as response:
+            shutil.copyfileobj(response, f, COPY_BUFFER_SIZE)
+    except BaseException as e:
+        # Never leave a partial download behind, whatever interrupted it
+        os.remove(zip_path)
+        if not isinstance(e, HTTPError):
+            raise
         if e.code == 400:
             print("Error 400: Export file exceeds 4GB limit. Try a smaller date range.")
         elif e.code == 404:
@@ -49,52 +70,58 @@ def export_data(api_key: str, secret_key: str, start: str, end: str, eu: bool =
             print(f"HTTP Error {e.code}: {e.reason}")
         sys.exit(1)
 
+    return Path(zip_path)
+
+
+def _extract_entry(zip_path: Path, zip_info: str, output_dir: Path) -> Path | None:
+    """Extract a single zip entry to output_dir, returning the output path.
+
+    Opens its own ZipFile handle so entries can be extracted from several threads.
+    Returns None for entries that are not JSON.
+    """
+    with zipfile.ZipFile(zip_path) as zf:
+        # Each file in the zip is gzipped JSON
+        if zip_info.endswith('.gz'):
+            # Decompress gzip (.json.gz or generic .gz), dropping the .gz extension
+            output_path = output_dir / Path(zip_info).stem
+            with zf.open(zip_info) as zin, gzip.GzipFile(fileobj=zin) as src, open(output_path, 'wb') as f:
+                shutil.copyfileobj(src, f, COPY_BUFFER_SIZE)
+
+        elif zip_info.endswith('.json'):
+            # Already JSON, just copy
+            output_path = output_dir / Path(zip_info).name
+            with zf.open(zip_info) as src, open(output_path, 'wb') as f:
+                shutil.copyfileobj(src, f, COPY_BUFFER_SIZE)
+
+        else:
+            return None
+
+    return output_path
 
-def extract_to_folder(data: bytes, output_dir: Path) -> int:
+
+def extract_to_folder(zip_path: Path, output_dir: Path) -> int:
     """Extract compressed data (zip containing gzipped JSON) to output folder.
 
+    Entries are streamed to disk so memory use stays flat regardless of export size,
+    and are decompressed in parallel since zlib releases the GIL.
     Returns the number of JSON files extracted.
     """
     output_dir.mkdir(parents=True, exist_ok=True)
     json_count = 0
 
     # The export API returns a zip file
-    with zipfile.ZipFile(io.BytesIO(data)) as zf:
-        for zip_info in zf.namelist():
+    with zipfile.ZipFile(zip_path) as zf:
+        zip_infos = zf.namelist()
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        output_paths = executor.map(lambda zip_info: _extract_entry(zip_path, zip_info, output_dir), zip_infos)
+        for zip_info, output_path in zip(zip_infos, output_paths):
             print(f"Processing: {zip_info}")
+            if output_path is None:
+                continue
 
-            file_data = zf.read(zip_info)
-
-            # Each file in the zip is gzipped JSON
-            if zip_info.endswith('.json.gz'):
-                # Decompress gzip
-                decompressed = gzip.decompress(file_data)
-                output_name = Path(zip_info).stem  # Remove .gz extension
-                output_path = output_dir / output_name
-
-                with open(output_path, 'wb') as f:
-                    f.write(decompressed)
-                json_count += 1
-                print(f"  -> Extracted: {output_path}")
-
-            elif zip_info.endswith('.json'):
-                # Already JSON, just copy
-                output_path = output_dir / Path(zip_info).name
-                with open(output_path, 'wb') as f:
-                    f.write(file_data)
-                json_count += 1
-                print(f"  -> Extracted: {output_path}")
-
-            elif zip_info.endswith('.gz'):
-                # Generic gzip file
-                decompressed = gzip.decompress(file_data)
-                output_name = Path(zip_info).stem
-                output_path = output_dir / output_name
-
-                with open(output_path, 'wb') as f:
-                    f.write(decompressed)
-                json_count += 1
-                print(f"  -> Extracted: {output_path}")
+            json_count += 1
+            print(f"  -> Extracted: {output_path}")
 
     return json_count
 
@@ -135,12 +162,17 @@ def main():
         print(f"Cleaning existing output directory: {output_dir}")
         shutil.rmtree(output_dir)
 
-    # Export data
-    data = export_data(args.api_key, args.secret_key, args.start, args.end, args.eu)
-    print(f"Downloaded {len(data)} bytes")
+    # Export data, downloading next to the output directory rather than into a possibly RAM-backed /tmp
+    download_dir = output_dir.resolve().parent
+    download_dir.mkdir(parents=True, exist_ok=True)
+    zip_path = export_data(args.api_key, args.secret_key, args.start, args.end, args.eu, download_dir)
+    try:
+        print(f"Downloaded {zip_path.stat().st_size} bytes")
 
-    # Extract to folder
-    json_count = extract_to_folder(data, output_dir)
+        # Extract to folder
+        json_count = extract_to_folder(zip_path, output_dir)
+    finally:
+        zip_path.unlink()
     print(f"\nExport complete! Extracted {json_count} JSON file(s) to {output_dir}")
 
 
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Upload bundled batch payloads to the Amplitude Batch API over persistent connections.
+
+Run with: poetry run python scripts/upload_batches.py --input ./requests
+"""
+
+import argparse
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPException, HTTPSConnection
+from pathlib import Path
+
+
+BATCH_PATH = "/batch"
+US_HOST = "api2.amplitude.com"
+EU_HOST = "api.eu.amplitude.com"
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+MAX_BACKOFF_SECONDS = 30
+REQUEST_TIMEOUT_SECONDS = 120
+
+# One keep-alive connection per worker thread, reused across its batches
+_local = threading.local()
+
+
+def get_connection(host: str) -> HTTPSConnection:
+    """Return this thread's connection to host, opening it on first use."""
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        connection = HTTPSConnection(host, timeout=REQUEST_TIMEOUT_SECONDS)
+        _local.connection = connection
+    return connection
+
+
+def reset_connection():
+    """Close this thread's connection so the next request opens a fresh one."""
+    connection = getattr(_local, "connection", None)
+    if connection is not None:
+        connection.close()
+        _local.connection = None
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return the delay in seconds from a Retry-After header, or None if absent or not a number.
+
+    Only the delay-seconds form is supported; an HTTP-date falls back to exponential backoff.
+    """
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        return None
+    return seconds if math.isfinite(seconds) and seconds >= 0 else None
+
+
+def upload_batch(host: str, payload_path: Path, max_retries: int) -> tuple[int | None, str]:
+    """POST one batch payload, retrying with Retry-After or exponential backoff.
+
+    Returns the final HTTP status (None if no response was received) and response body.
+    """
+    payload = payload_path.read_bytes()
+    headers = {"Content-Type": "application/json"}
+    if payload_path.suffix == ".gz":
+        headers["Content-Encoding"] = "gzip"
+
+    status, body = None, ""
+    retry_after = None
+    for attempt in range(max_retries + 1):
+        if attempt > 0:
+            # Prefer the server's Retry-After hint, otherwise back off exponentially
+            if retry_after is not None:
+                time.sleep(retry_after)
+            else:
+                time.sleep(min(2 ** (attempt - 1), MAX_BACKOFF_SECONDS))
+
+        try:
+            connection = get_connection(host)
+            connection.request("POST", BATCH_PATH, body=payload, headers=headers)
+            response = connection.getresponse()
+            status, body = response.status, response.read().decode('utf-8', errors='replace')
+        except (OSError, HTTPException) as e:
+            # The server may have dropped the keep-alive connection; reconnect and retry
+            reset_connection()
+            status, body, retry_after = None, str(e), None
+            continue
+
+        if status not in RETRYABLE_STATUSES:
+            break
+        retry_after = parse_retry_after(response.getheader("Retry-After"))
+
+    return status, body
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Upload bundled batch payloads to the Amplitude Batch API"
+    )
+    parser.add_argument(
+        "--input",
+        default="./requests",
+        help="Input directory containing batch_*.json or batch_*.json.gz payloads (default: ./requests)"
+    )
+    parser.add_argument(
+        "--eu",
+        action="store_true",
+        help="Use EU data residency endpoint"
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of batches uploaded concurrently (default: 1)"
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=5,
+        help="Retries per batch on rate limiting or server errors (default: 5)"
+    )
+
+    args = parser.parse_args()
+
+    input_dir = Path(args.input)
+
+    if not input_dir.exists():
+        print(f"Error: Input directory does not exist: {input_dir}")
+        return
+
+    if args.parallel < 1:
+        print(f"Error: --parallel must be at least 1, got {args.parallel}")
+        return
+
+    if args.retries < 0:
+        print(f"Error: --retries must not be negative, got {args.retries}")
+        return
+
+    payload_paths = sorted([*input_dir.glob("batch_*.json"), *input_dir.glob("batch_*.json.gz")])
+    if not payload_paths:
+        print(f"No batch payloads found in {input_dir}")
+        return
+
+    host = EU_HOST if args.eu else US_HOST
+    print(f"Uploading {len(payload_paths)} batch(es) to https://{host}{BATCH_PATH} ({args.parallel} in parallel)...\n")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        results = executor.map(lambda path: upload_batch(host, path, args.retries), payload_paths)
+        for payload_path, (status, body) in zip(payload_paths, results):
+            if status == 200:
+                print(f"  {payload_path.name}: OK")
+            else:
+                failed += 1
+                print(f"  {payload_path.name}: FAILED ({status}) {body}")
+
+    print(f"\nUpload complete! {len(payload_paths) - failed} succeeded, {failed} failed")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()